@@ -76,23 +76,24 @@ Configuration (optional):
 """
 
 import argparse
+import functools
+import io
+import mmap
+import os
 import re
+import shutil
 import subprocess
 import sys
-from math import log2
+from math import ceil, log2
 from pathlib import Path
+from dataclasses import dataclass
 from datetime import datetime
-from fnmatch import fnmatch
-from collections import defaultdict
-
-try:
-    import tomllib  # Python 3.11+
-except ImportError:
-    try:
-        import tomli as tomllib  # Fallback for older Python
-    except ImportError:
-        tomllib = None
-
+from fnmatch import translate
+from itertools import groupby
+from operator import attrgetter
+from collections import Counter, defaultdict
+from collections.abc import Iterable, Iterator
+from typing import BinaryIO
 
 # ── Default Configuration ────────────────────────────────────────────
 
@@ -166,12 +167,28 @@ CORE_FILE_CANDIDATES = [
 
 # ── Configuration Loading ────────────────────────────────────────────
 
+@functools.lru_cache(maxsize=None)
+def _get_tomllib():
+    """Import tomllib (or tomli) on first use; None if neither is available."""
+    try:
+        import tomllib  # Python 3.11+
+    except ImportError:
+        try:
+            import tomli as tomllib  # Fallback for older Python
+        except ImportError:
+            return None
+    return tomllib
+
+
 def load_config(root: Path) -> dict:
     """Load configuration from .scry.toml if present; otherwise use defaults."""
     config = dict(DEFAULT_CONFIG)
     config_path = root / ".scry.toml"
+    if not config_path.exists():
+        return config
 
-    if config_path.exists() and tomllib is not None:
+    tomllib = _get_tomllib()
+    if tomllib is not None:
         try:
             with open(config_path, "rb") as f:
                 data = tomllib.load(f)
@@ -180,7 +197,7 @@ def load_config(root: Path) -> dict:
                 config.update({k: v for k, v in user_config.items() if v is not None})
         except Exception as e:
             print(f"Warning: Failed to parse {config_path}: {e}", file=sys.stderr)
-    elif config_path.exists() and tomllib is None:
+    else:
         print(
             "Warning: .scry.toml found but tomllib/tomli not available. "
             "Using defaults. Install tomli for Python < 3.11: pip install tomli",
@@ -192,18 +209,37 @@ def load_config(root: Path) -> dict:
 
 # ── Project Auto-Detection ───────────────────────────────────────────
 
+@functools.lru_cache(maxsize=8)
+def _parse_pyproject(path: str, mtime_ns: int) -> dict | None:
+    """Parse a pyproject.toml file (mtime_ns keys the cache, so edits invalidate it)."""
+    tomllib = _get_tomllib()
+    if tomllib is None:
+        return None
+    try:
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+    except Exception:
+        return None
+
+
+def _load_pyproject(root: Path) -> dict | None:
+    """Return parsed root/pyproject.toml, or None if missing/unparseable."""
+    path = root / "pyproject.toml"
+    try:
+        mtime_ns = path.stat().st_mtime_ns
+    except OSError:
+        return None
+    return _parse_pyproject(str(path), mtime_ns)
+
+
 def detect_project_name(root: Path) -> str:
     """Auto-detect project name from pyproject.toml, setup.cfg, or directory name."""
     pyproject = root / "pyproject.toml"
-    if pyproject.exists() and tomllib is not None:
-        try:
-            with open(pyproject, "rb") as f:
-                data = tomllib.load(f)
-            name = data.get("project", {}).get("name")
-            if name:
-                return name
-        except Exception:
-            pass
+    data = _load_pyproject(root)
+    if data is not None:
+        project = data.get("project")
+        if isinstance(project, dict) and project.get("name"):
+            return project["name"]
 
     if pyproject.exists():
         try:
@@ -239,15 +275,129 @@ def detect_project_name(root: Path) -> str:
     return root.resolve().name
 
 
+def _compile_patterns(patterns: list[str]) -> re.Pattern:
+    """Compile glob patterns into a single regex matching any of them.
+
+    Patterns are normcased the way fnmatch does it, so
+    `regex.match(os.path.normcase(name))` is equivalent to
+    `any(fnmatch(name, p) for p in patterns)` on every platform.
+    """
+    if not patterns:
+        return re.compile(r"(?!)")  # Never matches
+    return re.compile(
+        "(?:" + "|".join(translate(os.path.normcase(p)) for p in patterns) + ")"
+    )
+
+
+def _ignore_set(config: dict) -> frozenset[str]:
+    """Return ignore_dirs as a frozenset, cached on the config."""
+    if "_ignore_set" not in config:
+        config["_ignore_set"] = frozenset(config["ignore_dirs"])
+    return config["_ignore_set"]
+
+
+def _ext_set(config: dict) -> frozenset[str]:
+    """Return extensions as a frozenset, cached on the config."""
+    if "_ext_set" not in config:
+        config["_ext_set"] = frozenset(config["extensions"])
+    return config["_ext_set"]
+
+
+def _compile_ignore(config: dict) -> re.Pattern:
+    """Return the compiled ignore_patterns regex, cached on the config."""
+    if "_ignore_re" not in config:
+        config["_ignore_re"] = _compile_patterns(config["ignore_patterns"])
+    return config["_ignore_re"]
+
+
 def _should_ignore(name: str, config: dict) -> bool:
     """Check if a file/directory name matches ignore rules."""
-    if name in set(config["ignore_dirs"]):
-        return True
-    if any(fnmatch(name, p) for p in config["ignore_patterns"]):
-        return True
-    if name.startswith("."):
-        return True
-    return False
+    return _is_ignored(name, _ignore_set(config), _compile_ignore(config))
+
+
+def _is_ignored(
+    name: str,
+    ignore_dirs: frozenset[str] | set[str],
+    ignore_re: re.Pattern,
+) -> bool:
+    """Check `name` against precomputed ignore_dirs and ignore_patterns."""
+    return (
+        name in ignore_dirs
+        or name.startswith(".")
+        or ignore_re.match(os.path.normcase(name)) is not None
+    )
+
+
+def _suffix(name: str) -> str:
+    """Return the extension of a file name (same rules as Path.suffix)."""
+    dot = name.rfind(".")
+    if 0 < dot < len(name) - 1:
+        return name[dot:]
+    return ""
+
+
+def _rel_prefix(path: str | Path, root: str | Path) -> tuple[str, int]:
+    """Return (prefix, start) for making paths found below `path` relative.
+
+    For any entry.path yielded by scanning `path`, `prefix + entry.path[start:]`
+    equals `str(Path(entry.path).relative_to(root))`, without building Paths.
+    """
+    rel = os.path.relpath(path, root)
+    prefix = "" if rel == os.curdir else rel + os.sep
+    return prefix, len(os.path.join(path, ""))
+
+
+def _scandir_recursive(
+    path: str | Path,
+    ignore_dirs: frozenset[str],
+    ignore_re: re.Pattern,
+    extensions: frozenset[str] | None = None,
+    follow_symlinks: bool = False,
+    _ancestors: frozenset[tuple[int, int]] = frozenset(),
+) -> Iterator[os.DirEntry]:
+    """Yield a DirEntry for every file below `path`, in sorted order.
+
+    Ignored names are pruned before descending. Symlinked directories are
+    only followed when `follow_symlinks` is set, in which case a link back
+    to one of its own ancestors is skipped.
+    """
+    if follow_symlinks:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        key = (st.st_dev, st.st_ino)
+        if key in _ancestors:
+            return
+        _ancestors = _ancestors | {key}
+
+    try:
+        with os.scandir(path) as it:
+            entries = sorted(it, key=lambda e: e.name)
+    except PermissionError:
+        return
+
+    for entry in entries:
+        name = entry.name
+        if _is_ignored(name, ignore_dirs, ignore_re):
+            continue
+        if entry.is_dir(follow_symlinks=follow_symlinks):
+            yield from _scandir_recursive(
+                entry.path, ignore_dirs, ignore_re, extensions,
+                follow_symlinks, _ancestors,
+            )
+        elif entry.is_file():
+            if extensions is None or _suffix(name) in extensions:
+                yield entry
+
+
+def _has_matching_file(path: str, extensions: frozenset[str]) -> bool:
+    """Return True if the directory `path` directly contains a matching file."""
+    try:
+        with os.scandir(path) as it:
+            return any(e.is_file() and _suffix(e.name) in extensions for e in it)
+    except PermissionError:
+        return False
 
 
 def discover_source_dirs(root: Path, config: dict) -> list[Path]:
@@ -260,36 +410,35 @@ def discover_source_dirs(root: Path, config: dict) -> list[Path]:
     if config.get("source_dirs"):
         return [root / d for d in config["source_dirs"] if (root / d).is_dir()]
 
-    source_dirs = []
-    extensions = set(config["extensions"])
-
-    # Check for src layout (src/package/)
-    src_dir = root / "src"
-    if src_dir.is_dir():
-        for item in sorted(src_dir.iterdir()):
-            if item.is_dir() and not _should_ignore(item.name, config): 
-                # Python package (has __init__.py)
-                if (item / "__init__.py").exists():
-                    source_dirs.append(item)
-                # Non-Python source dir (contains matching files)
-                elif any(f.suffix in extensions for f in item.iterdir() if f.is_file()):
-                    source_dirs.append(item)
-
-    # Check for flat layout (package/ or R/ etc. if directly in root dir)
-    for item in sorted(root.iterdir()):
-        if (
-            item.is_dir()
-            and not _should_ignore(item.name, config)
-            and item not in source_dirs
-        ):
-            # Python package
-            if (item / "__init__.py").exists():
-                source_dirs.append(item)
-            # Any dir with matching source files
-            elif any(f.suffix in extensions for f in item.iterdir() if f.is_file()):
-                source_dirs.append(item)
+    extensions = _ext_set(config)
+    ignore_dirs = _ignore_set(config)
+    ignore_re = _compile_ignore(config)
+
+    def _scan(path: Path) -> list[Path]:
+        try:
+            with os.scandir(path) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except (FileNotFoundError, NotADirectoryError):
+            return []
+
+        found = []
+        for entry in entries:
+            # Name checks first, so ignored dirs cost no syscalls at all
+            if _is_ignored(entry.name, ignore_dirs, ignore_re):
+                continue
+            if not entry.is_dir():
+                continue
+            # Python package (has __init__.py)
+            if os.path.exists(os.path.join(entry.path, "__init__.py")):
+                found.append(Path(entry.path))
+            # Non-Python source dir (contains matching files)
+            elif _has_matching_file(entry.path, extensions):
+                found.append(Path(entry.path))
+        return found
 
-    return source_dirs
+    # Check for src layout (src/package/), then flat layout (package/ or
+    # R/ etc. directly in the root dir)
+    return _scan(root / "src") + _scan(root)
 
 
 def discover_modules(source_dir: Path, root: Path, config: dict) -> dict[str, list[str]]:
@@ -299,27 +448,34 @@ def discover_modules(source_dir: Path, root: Path, config: dict) -> dict[str, li
     whether or not they contain __init__.py.
     """
     modules = {}
-    extensions = set(config["extensions"])
+    extensions = _ext_set(config)
+    ignore_dirs = _ignore_set(config)
+    ignore_re = _compile_ignore(config)
+    prefix, start = _rel_prefix(source_dir, root)
 
-    # Collect top-level files in the dir
+    with os.scandir(source_dir) as it:
+        entries = sorted(it, key=lambda e: e.name)
+
+    # Single pass: collect top-level files in the dir, and discover
+    # subdirs containing matching files
     top_level_files = []
-    for f in sorted(source_dir.iterdir()):
-        if f.is_file() and f.suffix in extensions:
-            top_level_files.append(str(f.relative_to(root)))
+    sub_modules = {}
+    for entry in entries:
+        if entry.is_file():
+            if _suffix(entry.name) in extensions:
+                top_level_files.append(prefix + entry.path[start:])
+        elif entry.is_dir() and not _should_ignore(entry.name, config):
+            module_files = [
+                prefix + e.path[start:]
+                for e in _scandir_recursive(entry.path, ignore_dirs, ignore_re, extensions)
+            ]
+            if module_files:
+                sub_modules[entry.name] = module_files
 
     if top_level_files:
         pkg_name = source_dir.name
         modules[pkg_name] = top_level_files
-
-    # Discover subdirs containing matching files
-    for item in sorted(source_dir.iterdir()):
-        if item.is_dir() and not _should_ignore(item.name, config):
-            module_files = []
-            for f in sorted(item.rglob("*")):
-                if f.is_file() and f.suffix in extensions and not _should_ignore(f.name, config):
-                    module_files.append(str(f.relative_to(root)))
-            if module_files:
-                modules[item.name] = module_files
+    modules.update(sub_modules)
 
     return modules
 
@@ -332,7 +488,9 @@ def discover_all_modules(root: Path, config: dict) -> dict[str, list[str]]:
     """
     all_modules = {}
     source_dirs = discover_source_dirs(root, config)
-    extensions = set(config["extensions"])
+    extensions = _ext_set(config)
+    ignore_dirs = _ignore_set(config)
+    ignore_re = _compile_ignore(config)
 
     for source_dir in source_dirs:
         sub_modules = discover_modules(source_dir, root, config)
@@ -355,10 +513,11 @@ def discover_all_modules(root: Path, config: dict) -> dict[str, list[str]]:
             and not _should_ignore(dir_name, config)
             and dir_name not in all_modules
         ):
-            matching_files = []
-            for f in sorted(dir_path.rglob("*")):
-                if f.is_file() and f.suffix in extensions:
-                    matching_files.append(str(f.relative_to(root)))
+            prefix, start = _rel_prefix(dir_path, root)
+            matching_files = [
+                prefix + e.path[start:]
+                for e in _scandir_recursive(dir_path, ignore_dirs, ignore_re, extensions)
+            ]
             if matching_files:
                 all_modules[dir_name] = matching_files
 
@@ -367,7 +526,7 @@ def discover_all_modules(root: Path, config: dict) -> dict[str, list[str]]:
         top_files = []
         for f in sorted(root.iterdir()):
             if f.is_file() and f.suffix in extensions and not _should_ignore(f.name, config):
-                top_files.append(str(f.relative_to(root)))
+                top_files.append(f.name)
         if top_files:
             all_modules["root"] = top_files
 
@@ -379,11 +538,20 @@ def detect_core_files(root: Path, source_dirs: list[Path], config: dict) -> list
     if config.get("core_files"):
         return list(config["core_files"])
 
-    core = []
-
-    for candidate in CORE_FILE_CANDIDATES:
-        if (root / candidate).exists():
-            core.append(candidate)
+    try:
+        with os.scandir(root) as it:
+            present = {entry.name for entry in it if entry.is_file()}
+    except OSError:
+        present = set()
+    folded = {name.casefold() for name in present}
+
+    core = [
+        candidate for candidate in CORE_FILE_CANDIDATES
+        if candidate in present
+        # Names differing only in case may still be the candidate on a
+        # case-insensitive filesystem (macOS, Windows); let the OS decide
+        or (candidate.casefold() in folded and (root / candidate).exists())
+    ]
 
     for source_dir in source_dirs:
         init_file = source_dir / "__init__.py"
@@ -401,43 +569,28 @@ def discover_all_files(
     root: Path,
     config: dict,
     extension_filter: list[str] | None = None,
-) -> dict[str, list[Path]]:
+) -> dict[str, list[os.DirEntry]]:
     """
     Walk the entire project tree and collect all files, grouped by
     their parent directory (relative to root).
+
+    Entries are returned as DirEntry objects, sorted by name within each
+    directory, so callers can use their cached stat() results.
     """
-    ignore_dirs = set(config["ignore_dirs"])
-    ignore_patterns = config["ignore_patterns"]
-    files_by_dir: dict[str, list[Path]] = defaultdict(list)
+    ignore_dirs = _ignore_set(config)
+    ignore_re = _compile_ignore(config)
+    files_by_dir: dict[str, list[os.DirEntry]] = defaultdict(list)
+    _, start = _rel_prefix(root, root)
 
     if extension_filter is not None:
-        extension_filter = set(extension_filter)
+        extension_filter = frozenset(extension_filter)
 
-    def _walk(directory: Path) -> None:
-        try:
-            entries = sorted(directory.iterdir(), key=lambda x: (x.is_file(), x.name))
-        except PermissionError:
-            return
-
-        for entry in entries:
-            if entry.name in ignore_dirs:
-                continue
-            if any(fnmatch(entry.name, p) for p in ignore_patterns):
-                continue
-            if entry.name.startswith("."):
-                continue
+    for entry in _scandir_recursive(
+        root, ignore_dirs, ignore_re, extension_filter, follow_symlinks=True
+    ):
+        rel_dir = os.path.dirname(entry.path[start:]) or "."
+        files_by_dir[rel_dir].append(entry)
 
-            if entry.is_dir():
-                _walk(entry)
-            elif entry.is_file():
-                if extension_filter is not None and entry.suffix not in extension_filter:
-                    continue
-                rel_dir = str(entry.parent.relative_to(root))
-                if rel_dir == ".":
-                    rel_dir = "."
-                files_by_dir[rel_dir].append(entry)
-
-    _walk(root)
     return dict(files_by_dir)
 
 
@@ -470,10 +623,13 @@ def print_file_listing(
     if extension_filter:
         filter_label = f"  (filter: {', '.join(sorted(extension_filter))})"
 
-    print(f"Project : {project_name}")
-    print(f"Root    : {root}")
-    print(f"Files   : {total_files}{filter_label}")
-    print("─" * 60)
+    lines = [
+        f"Project : {project_name}",
+        f"Root    : {root}",
+        f"Files   : {total_files}{filter_label}",
+        "─" * 60,
+    ]
+    add = lines.append
 
     ext_counts: dict[str, int] = defaultdict(int)
     ext_sizes: dict[str, int] = defaultdict(int)
@@ -481,36 +637,47 @@ def print_file_listing(
     for dir_rel in sorted(files_by_dir.keys()):
         file_list = files_by_dir[dir_rel]
         dir_label = dir_rel if dir_rel != "." else "(project root)"
-        print(f"\n  {dir_label}/  ({len(file_list)} file{'s' if len(file_list) != 1 else ''})")
+        add(f"\n  {dir_label}/  ({len(file_list)} file{'s' if len(file_list) != 1 else ''})")
 
-        for fpath in sorted(file_list, key=lambda p: p.name):
-            size = fpath.stat().st_size
-            ext = fpath.suffix if fpath.suffix else "(no ext)"
+        for entry in file_list:
+            size = entry.stat().st_size
+            ext = _suffix(entry.name) or "(no ext)"
             ext_counts[ext] += 1
             ext_sizes[ext] += size
 
-            rel_path = str(fpath.relative_to(root))
-            print(f"    • {rel_path:<55s} {format_file_size(size):>8s}")
+            rel_path = entry.name if dir_rel == "." else os.path.join(dir_rel, entry.name)
+            add(f"    • {rel_path:<55s} {format_file_size(size):>8s}")
 
-    print("\n" + "─" * 60)
-    print("Extension summary:")
-    print(f"  {'Extension':<15s} {'Count':>6s} {'Total Size':>12s}")
-    print(f"  {'─' * 15:<15s} {'─' * 6:>6s} {'─' * 12:>12s}")
+    add("\n" + "─" * 60)
+    add("Extension summary:")
+    add(f"  {'Extension':<15s} {'Count':>6s} {'Total Size':>12s}")
+    add(f"  {'─' * 15:<15s} {'─' * 6:>6s} {'─' * 12:>12s}")
     for ext in sorted(ext_counts.keys()):
-        print(f"  {ext:<15s} {ext_counts[ext]:>6d} {format_file_size(ext_sizes[ext]):>12s}")
+        add(f"  {ext:<15s} {ext_counts[ext]:>6d} {format_file_size(ext_sizes[ext]):>12s}")
 
     total_size = sum(ext_sizes.values())
-    print(f"  {'─' * 15:<15s} {'─' * 6:>6s} {'─' * 12:>12s}")
-    print(f"  {'TOTAL':<15s} {total_files:>6d} {format_file_size(total_size):>12s}")
+    add(f"  {'─' * 15:<15s} {'─' * 6:>6s} {'─' * 12:>12s}")
+    add(f"  {'TOTAL':<15s} {total_files:>6d} {format_file_size(total_size):>12s}")
+    sys.stdout.write("\n".join(lines) + "\n")
 
 
 # ── File & Git Utilities ─────────────────────────────────────────────
 
-def get_file_content(filepath: Path) -> str:
-    """Read file content; return error message if file doesn't exist."""
-    if filepath.exists():
-        return filepath.read_text(encoding="utf-8")
-    return f"# FILE NOT FOUND: {filepath}"
+def _stat_or_none(path: str | Path) -> os.stat_result | None:
+    """Return os.stat() for `path`, or None if it doesn't exist.
+
+    Lets callers check existence and read the size with one syscall.
+    """
+    try:
+        return os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+
+
+def _emit_file(out: BinaryIO, filepath: Path) -> None:
+    """Copy a file's raw bytes to `out`, without decoding/re-encoding them."""
+    with open(filepath, "rb") as f:
+        shutil.copyfileobj(f, out)
 
 
 def get_git_changed_files(root: Path, extensions: set[str] | None = None) -> list[str]:
@@ -518,48 +685,50 @@ def get_git_changed_files(root: Path, extensions: set[str] | None = None) -> lis
     if extensions is None:
         extensions = {".py"}
         
-    changed = []
-
+    if not extensions:
+        return []
+
+    # A single `git status` covers staged, unstaged and untracked changes,
+    # and also works in a new repo with no commits (no HEAD) yet. Extension
+    # filtering is done by git itself via "*.ext" pathspecs, which are
+    # relative to root; the paths it prints are relative to the repo top
+    # level, so root's own prefix within the repo is needed. At the top
+    # level (root/.git exists) that prefix is empty and git needn't be asked.
+    pathspecs = [f"*{ext}" for ext in sorted(extensions)]
     try:
-        # Staged and unstaged changes versus HEAD
-        result = subprocess.run(
-            ["git", "diff", "--name-only", "HEAD"],
-            capture_output=True, text=True, check=True, cwd=root,
-        )
-        changed.extend(result.stdout.strip().split("\n"))
-    except subprocess.CalledProcessError:
-        # If HEAD doesn't exist (e.g. new repo, no commits), get staged files instead
-        try:
-            result = subprocess.run(
-                ["git", "diff", "--name-only", "--cached"],
-                capture_output=True, text=True, check=True, cwd=root,
+        if os.path.exists(root / ".git"):
+            root_prefix = b""
+        else:
+            prefix = subprocess.run(
+                ["git", "rev-parse", "--show-prefix"],
+                capture_output=True, check=False, cwd=root,
             )
-            changed.extend(result.stdout.strip().split("\n"))
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            pass
-        
-    try:
-        # Untracked files
+            if prefix.returncode != 0:
+                return []
+            root_prefix = prefix.stdout.rstrip(b"\n")
         result = subprocess.run(
-            ["git", "ls-files", "--others", "--exclude-standard"],
-            capture_output=True, text=True, check=True, cwd=root,
+            [
+                "git", "--no-optional-locks", "status",
+                "--porcelain=v1", "-z", "--untracked-files=all", "--no-renames",
+                "--", *pathspecs,
+            ],
+            capture_output=True, check=False, cwd=root,
         )
-        changed.extend(result.stdout.strip().split("\n"))
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        pass
-    
-    # Filter by extension and remove empty strings
-    filtered = [f for f in changed if f and any(f.endswith(e) for e in extensions)]
-    
+    except FileNotFoundError:
+        return []
+    if result.returncode != 0:
+        return []
+
+    # NUL-separated "XY path" records; paths are not quoted with -z
+    start = 3 + len(root_prefix)
+    changed = [
+        os.fsdecode(record[start:])
+        for record in result.stdout.split(b"\0")
+        if record and record[3:].startswith(root_prefix)
+    ]
+
     # Remove dups while preserving order
-    seen = set()
-    unique = []
-    for f in filtered:
-        if f not in seen:
-            seen.add(f)
-            unique.append(f)
-            
-    return unique
+    return list(dict.fromkeys(changed))
 
 
 # ── Directory Tree ───────────────────────────────────────────────────
@@ -570,40 +739,44 @@ def get_directory_tree(
     max_depth: int = 3,
     ignore_dirs: set[str] | None = None,
     ignore_patterns: list[str] | None = None,
+    ignore_re: re.Pattern | None = None,
 ) -> str:
-    """Generate a directory tree string."""
+    """Generate a directory tree string.
+
+    `ignore_re` is a precompiled form of `ignore_patterns` (see
+    `_compile_patterns`). The tree is walked iteratively with an explicit
+    stack, appending to a single list of lines that is joined once.
+    """
     if max_depth == 0:
         return ""
     if ignore_dirs is None:
         ignore_dirs = set()
-    if ignore_patterns is None:
-        ignore_patterns = []
+    if ignore_re is None:
+        ignore_re = _compile_patterns(ignore_patterns or [])
 
-    try:
-        items = sorted(root.iterdir(), key=lambda x: (x.is_file(), x.name))
-    except PermissionError:
-        return ""
-
-    items = [
-        i for i in items
-        if i.name not in ignore_dirs
-        and not any(fnmatch(i.name, p) for p in ignore_patterns)
-        and not i.name.startswith(".")
-    ]
+    def _children(path, child_prefix: str, depth: int) -> list[tuple]:
+        """List the visible entries of `path` (dirs first) as stack items."""
+        try:
+            with os.scandir(path) as it:
+                entries = sorted(it, key=lambda e: (e.is_file(), e.name))
+        except PermissionError:
+            return []
+        entries = [e for e in entries if not _is_ignored(e.name, ignore_dirs, ignore_re)]
+        last = len(entries) - 1
+        return [(e, child_prefix, i == last, depth) for i, e in enumerate(entries)]
 
     lines = []
-    for i, item in enumerate(items):
-        is_last = i == len(items) - 1
+    # Children are pushed in reverse so they pop off the stack in order
+    stack = _children(root, prefix, max_depth)[::-1]
+    while stack:
+        entry, item_prefix, is_last, depth = stack.pop()
         connector = "└── " if is_last else "├── "
-        lines.append(f"{prefix}{connector}{item.name}")
+        lines.append(f"{item_prefix}{connector}{entry.name}")
 
-        if item.is_dir():
+        # depth == 1 is the last level shown (negative depth is unlimited)
+        if depth != 1 and entry.is_dir():
             extension = "    " if is_last else "│   "
-            subtree = get_directory_tree(
-                item, prefix + extension, max_depth - 1, ignore_dirs, ignore_patterns
-            )
-            if subtree:
-                lines.append(subtree)
+            stack.extend(reversed(_children(entry.path, item_prefix + extension, depth - 1)))
 
     return "\n".join(lines)
 
@@ -627,54 +800,58 @@ def format_output_txt(
     project_name: str,
     config: dict,
     include_tree: bool = True,
-) -> str:
-    """Format the output as plain text with markdown-style fences."""
-    parts = []
+    *,
+    out: BinaryIO,
+) -> None:
+    """Write the output as plain text with markdown-style fences to `out`.
+
+    Sections are written as they are produced, and file contents are
+    copied through as raw bytes, so no file is decoded or held in memory.
+    """
+    def write(text: str) -> None:
+        out.write(text.encode("utf-8"))
 
-    parts.append("=" * 70)
-    parts.append(
+    write("=" * 70 + "\n")
+    write(
         f"{project_name.upper()} CODE EXPORT — "
-        f"{datetime.now().strftime('%Y-%m-%d %H:%M')}"
+        f"{datetime.now().strftime('%Y-%m-%d %H:%M')}\n"
     )
-    parts.append("=" * 70)
+    write("=" * 70 + "\n")
 
     if include_tree:
-        parts.append("\n## PROJECT STRUCTURE\n")
-        parts.append("```")
-        parts.append(f"{root.resolve().name}/")
-        parts.append(
-            get_directory_tree(
-                root,
-                max_depth=config.get("tree_depth", 3),
-                ignore_dirs=set(config["ignore_dirs"]),
-                ignore_patterns=config["ignore_patterns"],
-            )
+        write("\n## PROJECT STRUCTURE\n\n")
+        write("```\n")
+        write(f"{root.resolve().name}/\n")
+        tree = get_directory_tree(
+            root,
+            max_depth=config.get("tree_depth", 3),
+            ignore_dirs=_ignore_set(config),
+            ignore_re=_compile_ignore(config),
         )
-        parts.append("```")
+        write(tree + "\n")
+        write("```\n")
 
-    parts.append("\n## FILE CONTENTS\n")
+    write("\n## FILE CONTENTS\n\n")
 
+    lang_for = LANG_MAP.get
     for filepath in files:
-        path = root / filepath if not Path(filepath).is_absolute() else Path(filepath)
-        lang = LANG_MAP.get(path.suffix, "")
-
-        parts.append(f"### {filepath}")
-        if path.exists():
-            content = get_file_content(path)
-            parts.append(f"```{lang}")
-            parts.append(content)
-            parts.append("```")
+        path = root / filepath
+        lang = lang_for(path.suffix, "")
+
+        write(f"### {filepath}\n")
+        if _stat_or_none(path) is not None:
+            write(f"```{lang}\n")
+            _emit_file(out, path)
+            write("\n```\n")
         else:
-            parts.append("```")
-            parts.append(f"# FILE NOT FOUND: {filepath}")
-            parts.append("```")
-        parts.append("")
+            write("```\n")
+            write(f"# FILE NOT FOUND: {filepath}\n")
+            write("```\n")
+        write("\n")
 
-    parts.append("=" * 70)
-    parts.append("END OF EXPORT")
-    parts.append("=" * 70)
-
-    return "\n".join(parts)
+    write("=" * 70 + "\n")
+    write("END OF EXPORT\n")
+    write("=" * 70)
 
 
 # ── XML Output Formatting ───────────────────────────────────────────
@@ -712,9 +889,11 @@ def format_output_xml(
     project_name: str,
     config: dict,
     include_tree: bool = True,
-) -> str:
+    *,
+    out: BinaryIO,
+) -> None:
     """
-    Format the output as structured XML, optimised for LLM parsing.
+    Write the output as structured XML, optimised for LLM parsing, to `out`.
 
     Produces a structure like:
 
@@ -752,104 +931,128 @@ def format_output_xml(
         </codebase>
     """
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M")
-    parts = []
+
+    def write(text: str) -> None:
+        out.write(text.encode("utf-8"))
 
     # XML declaration
-    parts.append('<?xml version="1.0" encoding="UTF-8"?>')
+    write('<?xml version="1.0" encoding="UTF-8"?>\n')
 
     # Root element
-    parts.append(
+    write(
         f'<codebase project="{xml_escape(project_name)}" '
         f'exported="{timestamp}" '
-        f'total_files="{len(files)}">'
+        f'total_files="{len(files)}">\n'
     )
 
     # Preamble instruction for the LLM
-    parts.append("  <export_notes>")
+    write("  <export_notes>\n")
     note_text = (
         f"This is an export of the {project_name} codebase. "
         f"Each <file> element contains the full contents of one source file "
         f"wrapped in CDATA. Use the 'path' attribute to identify files."
     )
-    parts.append(f"    {cdata_wrap(note_text)}")
-    parts.append("  </export_notes>")
+    write(f"    {cdata_wrap(note_text)}\n")
+    write("  </export_notes>\n")
 
     # Project structure (directory tree)
     if include_tree:
         tree = get_directory_tree(
             root,
             max_depth=config.get("tree_depth", 3),
-            ignore_dirs=set(config["ignore_dirs"]),
-            ignore_patterns=config["ignore_patterns"],
+            ignore_dirs=_ignore_set(config),
+            ignore_re=_compile_ignore(config),
         )
         tree_text = f"{root.resolve().name}/\n{tree}"
-        parts.append("")
-        parts.append("  <project_structure>")
-        parts.append(f"    {cdata_wrap(tree_text)}")
-        parts.append("  </project_structure>")
+        write("\n")
+        write("  <project_structure>\n")
+        write(f"    {cdata_wrap(tree_text)}\n")
+        write("  </project_structure>\n")
 
     # File contents
-    parts.append("")
-    parts.append("  <files>")
+    write("\n")
+    write("  <files>\n")
 
+    lang_for = LANG_MAP.get
     for filepath in files:
-        path = root / filepath if not Path(filepath).is_absolute() else Path(filepath)
-        lang = LANG_MAP.get(path.suffix, "unknown")
-        ext = path.suffix or "(none)"
-
-        if path.exists():
-            content = get_file_content(path)
-            size = path.stat().st_size
-
-            parts.append(
+        path = root / filepath
+        suffix = path.suffix
+        lang = lang_for(suffix, "unknown")
+        ext = suffix or "(none)"
+
+        st = _stat_or_none(path)
+        if st is not None:
+            # Invalid UTF-8 is replaced, since the document declares UTF-8
+            content = path.read_bytes().decode("utf-8", errors="replace")
+            size = st.st_size
+
+            write(
                 f'    <file path="{xml_escape(filepath)}" '
                 f'extension="{xml_escape(ext)}" '
                 f'language="{xml_escape(lang)}" '
-                f'size="{size}">'
+                f'size="{size}">\n'
             )
-            parts.append(f"      {cdata_wrap(content)}")
-            parts.append("    </file>")
+            write("      <![CDATA[")
+            write(content.replace("]]>", "]]]]><![CDATA[>"))
+            write("]]>\n")
+            write("    </file>\n")
         else:
-            parts.append(
+            write(
                 f'    <file path="{xml_escape(filepath)}" '
-                f'status="not_found">'
+                f'status="not_found">\n'
             )
-            parts.append(f"      {cdata_wrap(f'FILE NOT FOUND: {filepath}')}")
-            parts.append("    </file>")
+            write(f"      {cdata_wrap(f'FILE NOT FOUND: {filepath}')}\n")
+            write("    </file>\n")
 
-    parts.append("  </files>")
+    write("  </files>\n")
 
     # Export metadata
-    parts.append("")
-    parts.append("  <export_metadata>")
-    parts.append("    <tool>scry</tool>")
-    parts.append("    <format_version>1.0</format_version>")
-    parts.append(f"    <file_count>{len(files)}</file_count>")
-    parts.append(f"    <timestamp>{timestamp}</timestamp>")
-    parts.append("  </export_metadata>")
+    write("\n")
+    write("  <export_metadata>\n")
+    write("    <tool>scry</tool>\n")
+    write("    <format_version>1.0</format_version>\n")
+    write(f"    <file_count>{len(files)}</file_count>\n")
+    write(f"    <timestamp>{timestamp}</timestamp>\n")
+    write("  </export_metadata>\n")
 
     # Close root
-    parts.append("")
-    parts.append("</codebase>")
-
-    return "\n".join(parts)
+    write("\n")
+    write("</codebase>")
 
 
 # ── Unified Format Dispatcher ────────────────────────────────────────
 
-def format_output(
+def write_output(
     files: list[str],
     root: Path,
     project_name: str,
     config: dict,
     include_tree: bool = True,
     output_format: str = "txt",
-) -> str:
+    *,
+    out: BinaryIO,
+) -> None:
     """Dispatch to the appropriate formatter based on output_format."""
     if output_format == "xml":
-        return format_output_xml(files, root, project_name, config, include_tree)
+        format_output_xml(files, root, project_name, config, include_tree, out=out)
     else:
-        return format_output_txt(files, root, project_name, config, include_tree)
+        format_output_txt(files, root, project_name, config, include_tree, out=out)
+
+
+def format_output(
+    files: list[str],
+    root: Path,
+    project_name: str,
+    config: dict,
+    include_tree: bool = True,
+    output_format: str = "txt",
+) -> str:
+    """Return the formatted output as a string (see write_output)."""
+    buf = io.BytesIO()
+    write_output(
+        files, root, project_name, config, include_tree, output_format, out=buf
+    )
+    return buf.getvalue().decode("utf-8", errors="replace")
 
 
 # ── Config File Generation ───────────────────────────────────────────
@@ -916,152 +1119,251 @@ def generate_config_template(root: Path, config: dict) -> str:
 # ── Secret Detection ─────────────────────────────────────────────────
 
 # Patterns that indicate potential secrets in file contents.
-# Each entry: (name, compiled regex, description)
-SECRET_PATTERNS: list[tuple[str, re.Pattern, str]] = [
+# Each entry: (name, regex source, description). Regexes are compiled on
+# first use by _secret_regexes(), so invocations that never scan skip the cost.
+SECRET_PATTERNS: tuple[tuple[str, str, str], ...] = (
     (
         "AWS Access Key",
-        re.compile(r"(?:^|[^A-Z0-9])AKIA[0-9A-Z]{16}(?:[^A-Z0-9]|$)"),
+        r"(?:^|[^A-Z0-9])AKIA[0-9A-Z]{16}(?:[^A-Z0-9]|$)",
         "AWS access key ID detected",
     ),
     (
         "AWS Secret Key",
-        re.compile(
-            r"""(?i)aws[_\-\s]*secret[_\-\s]*(?:access)?[_\-\s]*key\s*[=:]\s*['"]?[A-Za-z0-9/+=]{40}"""
-        ),
+        r"""(?i)aws[_\-\s]*secret[_\-\s]*(?:access)?[_\-\s]*key\s*[=:]\s*['"]?[A-Za-z0-9/+=]{40}""",
         "AWS secret access key assignment detected",
     ),
     (
         "Private Key",
-        re.compile(r"-----BEGIN (?:RSA |EC |DSA |OPENSSH )?PRIVATE KEY-----"),
+        r"-----BEGIN (?:RSA |EC |DSA |OPENSSH )?PRIVATE KEY-----",
         "Private key block detected",
     ),
     (
         "GitHub Token",
-        re.compile(r"(?:ghp|gho|ghu|ghs|ghr)_[A-Za-z0-9_]{36,255}"),
+        r"(?:ghp|gho|ghu|ghs|ghr)_[A-Za-z0-9_]{36,255}",
         "GitHub personal access token detected",
     ),
     (
         "GitLab Token",
-        re.compile(r"glpat-[A-Za-z0-9\-]{20,}"),
+        r"glpat-[A-Za-z0-9\-]{20,}",
         "GitLab personal access token detected",
     ),
     (
         "Slack Token",
-        re.compile(r"xox[bporas]-[A-Za-z0-9\-]{10,}"),
+        r"xox[bporas]-[A-Za-z0-9\-]{10,}",
         "Slack API token detected",
     ),
     (
         "Generic API Key",
-        re.compile(
-            r"""(?i)(?:api[_\-\s]*key|apikey|api[_\-\s]*secret|api[_\-\s]*token)\s*[=:]\s*['"]?[A-Za-z0-9_\-]{20,}['"]?"""
-        ),
+        r"""(?i)(?:api[_\-\s]*key|apikey|api[_\-\s]*secret|api[_\-\s]*token)\s*[=:]\s*['"]?[A-Za-z0-9_\-]{20,}['"]?""",
         "Generic API key assignment detected",
     ),
     (
         "Generic Secret",
-        re.compile(
-            r"""(?i)(?:secret|password|passwd|pwd|token|auth[_\-\s]*token|access[_\-\s]*token)\s*[=:]\s*['"]?[^\s'"]{8,}['"]?"""
-        ),
+        r"""(?i)(?:secret|password|passwd|pwd|token|auth[_\-\s]*token|access[_\-\s]*token)\s*[=:]\s*['"]?[^\s'"]{8,}['"]?""",
         "Potential secret/password assignment detected",
     ),
     (
         "Database URL",
-        re.compile(
-            r"""(?i)(?:postgres|mysql|mongodb|redis|amqp|sqlite):\/\/[^\s'"]+:[^\s'"]+@"""
-        ),
+        r"""(?i)(?:postgres|mysql|mongodb|redis|amqp|sqlite):\/\/[^\s'"]+:[^\s'"]+@""",
         "Database connection string with credentials detected",
     ),
     (
         "JWT",
-        re.compile(r"eyJ[A-Za-z0-9_-]{10,}\.eyJ[A-Za-z0-9_-]{10,}\.[A-Za-z0-9_\-]{10,}"),
+        r"eyJ[A-Za-z0-9_-]{10,}\.eyJ[A-Za-z0-9_-]{10,}\.[A-Za-z0-9_\-]{10,}",
         "JSON Web Token detected",
     ),
     (
         "Heroku API Key",
-        re.compile(
-            r"""(?i)heroku[_\-\s]*(?:api)?[_\-\s]*key\s*[=:]\s*['"]?[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}['"]?"""
-        ),
+        r"""(?i)heroku[_\-\s]*(?:api)?[_\-\s]*key\s*[=:]\s*['"]?[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}['"]?""",
         "Heroku API key detected",
     ),
     (
         "Stripe Key",
-        re.compile(r"(?:sk|pk)_(?:live|test)_[A-Za-z0-9]{20,}"),
+        r"(?:sk|pk)_(?:live|test)_[A-Za-z0-9]{20,}",
         "Stripe API key detected",
     ),
     (
         "SendGrid Key",
-        re.compile(r"SG\.[A-Za-z0-9_\-]{22}\.[A-Za-z0-9_\-]{43}"),
+        r"SG\.[A-Za-z0-9_\-]{22}\.[A-Za-z0-9_\-]{43}",
         "SendGrid API key detected",
     ),
     (
         "PyPI Token",
-        re.compile(r"pypi-[A-Za-z0-9_\-]{20,}"),
+        r"pypi-[A-Za-z0-9_\-]{20,}",
         "PyPI API token detected",
     ),
     (
         "npm Token",
-        re.compile(r"npm_[A-Za-z0-9]{36,}"),
+        r"npm_[A-Za-z0-9]{36,}",
         "npm access token detected",
     ),
     (
         "Azure Key",
-        re.compile(r"(?i)azure[_\-\s]*(?:key|secret|token|password)\s*[=:]\s*['\"]?[A-Za-z0-9+/=]{20,}['\"]?"),
+        r"(?i)azure[_\-\s]*(?:key|secret|token|password)\s*[=:]\s*['\"]?[A-Za-z0-9+/=]{20,}['\"]?",
         "Azure credential detected",
     ),
     (
         "Google API Key",
-        re.compile(r"AIza[0-9A-Za-z_\-]{35}"),
+        r"AIza[0-9A-Za-z_\-]{35}",
         "Google API key detected",
     ),
     (
         "Google OAuth",
-        re.compile(r"[0-9]+-[a-z0-9_]{32}\.apps\.googleusercontent\.com"),
+        r"[0-9]+-[a-z0-9_]{32}\.apps\.googleusercontent\.com",
         "Google OAuth client ID detected",
     ),
     (
         "Twilio Key",
-        re.compile(r"SK[0-9a-fA-F]{32}"),
+        r"SK[0-9a-fA-F]{32}",
         "Twilio API key detected",
     ),
     (
         "Mailgun Key",
-        re.compile(r"key-[0-9a-zA-Z]{32}"),
+        r"key-[0-9a-zA-Z]{32}",
         "Mailgun API key detected",
     ),
     (
         "Square Token",
-        re.compile(r"sq0[a-z]{3}-[0-9A-Za-z_\-]{22,}"),
+        r"sq0[a-z]{3}-[0-9A-Za-z_\-]{22,}",
         "Square access token detected",
     ),
-]
+)
+
+
+# Literal fragments that every SECRET_PATTERNS match must contain (the
+# first group case-insensitively). A line containing none of them cannot
+# match any pattern, so the per-pattern regexes are only run on lines that
+# pass this cheap filter. Keep in sync with SECRET_PATTERNS when adding
+# patterns.
+_SECRET_HINTS_NOCASE = ("aws", "api", "secret", "passw", "pwd", "token", "heroku", "azure")
+_SECRET_HINTS = (
+    "AKIA", "-----BEGIN", "ghp_", "gho_", "ghu_", "ghs_", "ghr_", "glpat-",
+    "xox", "://", "eyJ", "_live_", "_test_", "SG.", "pypi-", "npm_", "AIza",
+    "googleusercontent", "SK", "key-", "sq0",
+)
+_SECRET_PREFILTER = (
+    "(?i:" + "|".join(map(re.escape, _SECRET_HINTS_NOCASE)) + ")|"
+    + "|".join(map(re.escape, _SECRET_HINTS))
+)
+
+
+@functools.lru_cache(maxsize=None)
+def _secret_prefilter() -> re.Pattern:
+    """Return the compiled _SECRET_PREFILTER regex."""
+    return re.compile(_SECRET_PREFILTER)
+
+
+def _could_match_secret(line: str) -> bool:
+    """Return False if `line` cannot match any SECRET_PATTERNS regex."""
+    if not line.isascii():
+        # str (?i) matching folds some non-ASCII letters onto ASCII ones
+        # (e.g. K onto k), which lower() doesn't reproduce
+        return _secret_prefilter().search(line) is not None
+    lowered = line.lower()
+    for hint in _SECRET_HINTS_NOCASE:
+        if hint in lowered:
+            return True
+    for hint in _SECRET_HINTS:
+        if hint in line:
+            return True
+    return False
+
+
+@functools.lru_cache(maxsize=None)
+def _secret_prefilter_bytes() -> re.Pattern:
+    """Return _SECRET_PREFILTER as a regex over raw UTF-8 bytes.
+
+    Besides ASCII, str (?i) matching folds a few non-ASCII letters onto
+    i, k and s (İ, ı, K, ſ); their encodings are added so the bytes
+    filter never rejects something the str patterns would match.
+    """
+    return re.compile(_SECRET_PREFILTER.encode() + rb"|\xc4[\xb0\xb1]|\xe2\x84\xaa|\xc5\xbf")
+
+
+@functools.lru_cache(maxsize=None)
+def _secret_regexes() -> tuple[tuple[str, re.Pattern, str], ...]:
+    """Return SECRET_PATTERNS with every regex compiled, in the same order."""
+    return tuple(
+        (name, re.compile(pattern), description)
+        for name, pattern, description in SECRET_PATTERNS
+    )
+
+
+# File-level checks (the filename itself suggests secrets). Plain
+# extensions are a dict lookup on the lowercased suffix; the rest are regexes
+SENSITIVE_FILE_SUFFIXES: dict[str, str] = {
+    ".pem": "Private key file",
+    ".key": "Private key file",
+    ".p12": "Certificate",
+    ".keystore": "Keystore",
+    ".htpasswd": "htpasswd",
+}
+
+# Each entry: (name, regex source), compiled on first use like SECRET_PATTERNS
+SENSITIVE_FILE_PATTERNS: tuple[tuple[str, str], ...] = (
+    ("Environment file", r"^\.env(?:\..+)?$"),
+    ("Credentials file", r"(?i).*credentials.*"),
+    ("Secret config", r"(?i).*secrets?\.(?:ya?ml|json|toml|cfg|ini)$"),
+    ("Key file", r"(?i).*id_(?:rsa|dsa|ecdsa|ed25519)$"),
+    ("Token/credential file", r"(?i).*(?:token|key|secret|cred|auth|password).*\.txt$"),
+)
+
+
+@functools.lru_cache(maxsize=None)
+def _sensitive_file_regexes() -> tuple[re.Pattern, tuple[tuple[str, re.Pattern], ...]]:
+    """Return (combined regex, compiled SENSITIVE_FILE_PATTERNS).
+
+    The combined regex matches wherever any single pattern does (leading
+    (?i) flags are scoped to their own branch), so names matching none of
+    them cost a single match().
+    """
+    combined = re.compile(
+        "|".join(
+            f"(?i:{pattern[4:]})" if pattern.startswith("(?i)") else f"(?:{pattern})"
+            for _, pattern in SENSITIVE_FILE_PATTERNS
+        )
+    )
+    return combined, tuple((name, re.compile(pattern)) for name, pattern in SENSITIVE_FILE_PATTERNS)
+
+
+# c * log2(c) for the character counts of typical tokens, so entropy needs
+# no log2() call per distinct character
+_CLOG2C = tuple(c * log2(c) if c else 0.0 for c in range(257))
 
-# File-level patterns (the filename itself suggests secrets)
-SENSITIVE_FILE_PATTERNS: list[tuple[str, re.Pattern]] = [
-    ("Private key file", re.compile(r"(?i).*\.pem$")),
-    ("Private key file", re.compile(r"(?i).*\.key$")),
-    ("Environment file", re.compile(r"^\.env(?:\..+)?$")),
-    ("Credentials file", re.compile(r"(?i).*credentials.*")),
-    ("Secret config", re.compile(r"(?i).*secrets?\.(?:ya?ml|json|toml|cfg|ini)$")),
-    ("Key file", re.compile(r"(?i).*id_(?:rsa|dsa|ecdsa|ed25519)$")),
-    ("Certificate", re.compile(r"(?i).*\.p12$")),
-    ("Keystore", re.compile(r"(?i).*\.keystore$")),
-    ("htpasswd", re.compile(r"(?i).*\.htpasswd$")),
-    ("Token/credential file", re.compile(r"(?i).*(?:token|key|secret|cred|auth|password).*\.txt$")),
-]
 
 def _line_entropy(line: str) -> float:
     """Calculate Shannon entropy of a string (bits per char)."""
     if not line:
         return 0.0
-    freq: dict[str,int] = {}
-    for ch in line:
-        freq[ch] = freq.get(ch, 0) + 1
     length = len(line)
-    return -sum((c / length) * log2(c / length) for c in freq.values())
+    counts = Counter(line).values()
+    if length < len(_CLOG2C):
+        total = sum(map(_CLOG2C.__getitem__, counts))
+    else:
+        total = sum(c * log2(c) for c in counts)
+    # -sum((c/n) * log2(c/n)) rearranged to log2(n) - sum(c * log2(c)) / n
+    return log2(length) - total / length
 
 # Minimum length and entropy thresholds for bare secret detection
 _MIN_SECRET_LENGTH = 20
 _MIN_SECRET_ENTROPY = 4.5   # Random strings generally have entropy > 4.5
+_MIN_SECRET_CHARS = ceil(2 ** _MIN_SECRET_ENTROPY)  # Distinct chars needed
+
+
+@functools.lru_cache(maxsize=None)
+def _long_token_regex() -> re.Pattern:
+    """Return a regex matching any run of non-space chars long enough to be a secret."""
+    return re.compile(rf"\S{{{_MIN_SECRET_LENGTH},}}")
+
+
+@functools.lru_cache(maxsize=None)
+def _long_token_regex_bytes() -> re.Pattern:
+    """Return _long_token_regex() over raw bytes.
+
+    Bytes runs are never shorter than the str runs they encode, and only
+    ASCII whitespace splits them, so this matches wherever the str one does.
+    """
+    return re.compile(rb"\S{%d,}" % _MIN_SECRET_LENGTH)
 
 def _is_likely_secret(token: str) -> bool:
     """
@@ -1074,153 +1376,281 @@ def _is_likely_secret(token: str) -> bool:
     """
     if len(token) < _MIN_SECRET_LENGTH:
         return False
-    
-    if _line_entropy(token) < _MIN_SECRET_ENTROPY:
+
+    # Entropy can't exceed log2(number of distinct chars), so tokens with
+    # too few distinct chars are rejected without computing it
+    chars = set(token)
+    if len(chars) < _MIN_SECRET_CHARS:
         return False
-    
+
+    if not (any(c.isdigit() for c in chars) and any(c.isalpha() for c in chars)):
+        return False
+
     alnum_chars = sum(1 for c in token if c.isalnum() or c in "-_/+=")
     alnum_ratio = alnum_chars / len(token)
     if alnum_ratio < 0.90:
         return False
-    
-    if not (any(c.isdigit() for c in token) and any(c.isalpha() for c in token)):
+
+    # Most expensive check last
+    if _line_entropy(token) < _MIN_SECRET_ENTROPY:
         return False
-    
+
     return True
 
-def scan_content_for_secrets(content: str, filepath: str) -> list[dict]:
+@dataclass(slots=True, frozen=True)
+class Finding:
+    """A potential secret found in a file's name or content."""
+    pattern_name: str
+    description: str
+    filepath: str
+    line_number: int    # 0 for filename matches
+    line_preview: str   # Truncated line showing the match vicinity
+
+
+def scan_content_for_secrets(content: str, filepath: str) -> list[Finding]:
     """
     Scan file content for potential secrets.
 
-    Returns a list of findings, each a dict with keys:
-        - pattern_name: str
-        - description: str
-        - filepath: str
-        - line_number: int
-        - line_preview: str (truncated line showing the match vicinity)
+    Returns a list of Finding objects, one per pattern matched on a line.
     """
+    # Whole-file fast path: with no pattern fragment and no token long
+    # enough for the high-entropy check, no line can produce a finding
+    if not _secret_prefilter().search(content) and not _long_token_regex().search(content):
+        return []
+
+    return _scan_lines(content.splitlines(), filepath)
+
+
+def scan_file_for_secrets(path: Path, filepath: str) -> list[Finding]:
+    """
+    Scan a file on disk for potential secrets (see scan_content_for_secrets).
+
+    The whole-file fast path runs over an mmap of the raw bytes, so files
+    that can't produce a finding are never decoded or copied into memory.
+    Other files are decoded and scanned a line at a time. Raises
+    UnicodeDecodeError if the file isn't valid UTF-8.
+    """
+    with open(path, "rb") as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # Empty files, files reporting size 0 (e.g. under /proc) and
+            # files on mounts without mmap support: use the streamed scan
+            data = None
+        if data is not None:
+            with data:
+                if (
+                    not _secret_prefilter_bytes().search(data)
+                    and not _long_token_regex_bytes().search(data)
+                ):
+                    return []
+
+    # newline="" leaves line endings untranslated, and splitlines() then
+    # breaks lines on the same boundaries as splitting the whole content
+    with open(path, encoding="utf-8", newline="") as f:
+        return _scan_lines((line for chunk in f for line in chunk.splitlines()), filepath)
+
+
+def _scan_lines(lines: Iterable[str], filepath: str) -> list[Finding]:
+    """Scan a file's lines for potential secrets, numbering them from 1."""
     findings = []
+    patterns = _secret_regexes()
+    long_tokens = _long_token_regex()
 
-    for line_num, line in enumerate(content.splitlines(), start=1):
+    for line_num, line in enumerate(lines, start=1):
         stripped = line.strip()
         
         # Skip empty lines
         if not stripped:
             continue
         
-        # Skip comment lines (rough heuristic; covers Python, YAML, TOML, shell)
-        if stripped.startswith("#") and "=" not in stripped and ":" not in stripped:
+        # Skip comment lines (rough heuristic; covers Python, YAML, TOML, shell).
+        if stripped[0] == "#" and "=" not in stripped and ":" not in stripped:
             continue
         
         matched = False
 
-        for pattern_name, regex, description in SECRET_PATTERNS:
+        # Only run the individual patterns if the line could match one
+        candidates = patterns if _could_match_secret(line) else ()
+        for pattern_name, regex, description in candidates:
             if regex.search(line):
                 # Truncate the line for preview to avoid showing the secret
                 preview = stripped
                 if len(preview) > 80:
                     preview = preview[:77] + "..."
 
-                findings.append({
-                    "pattern_name": pattern_name,
-                    "description": description,
-                    "filepath": filepath,
-                    "line_number": line_num,
-                    "line_preview": preview,
-                })
+                findings.append(Finding(
+                    pattern_name=pattern_name,
+                    description=description,
+                    filepath=filepath,
+                    line_number=line_num,
+                    line_preview=preview,
+                ))
                 matched = True
                 
         # Fallback: Detect high-entropy strings that look like bare tokens
         if not matched:
-            # Check each whitespace-delimited token on the line
-            for token in stripped.split():
+            # Check each whitespace-delimited token on the line. Stripping
+            # only shortens a token, so shorter ones are never extracted
+            for token in long_tokens.findall(stripped):
                 # Strip quotes and common delims
                 clean = token.strip("\"'`,;:=()[]{}< >")
                 if _is_likely_secret(clean):
                     preview = stripped
                     if len(preview) > 80:
                         preview = preview[:77] + "..."
-                        
-                    findings.append({
-                        "pattern_name": "High-Entropy String",
-                        "description": "Possible secret or token (high entropy)",
-                        "filepath": filepath,
-                        "line_number": line_num,
-                        "line_preview": preview,
-                    })
+
+                    findings.append(Finding(
+                        pattern_name="High-Entropy String",
+                        description="Possible secret or token (high entropy)",
+                        filepath=filepath,
+                        line_number=line_num,
+                        line_preview=preview,
+                    ))
                     break   # One finding per line
 
     return findings
 
 
-def scan_filename_for_secrets(filepath: str) -> list[dict]:
+def scan_filename_for_secrets(filepath: str) -> list[Finding]:
     """Check if a filename matches patterns associated with sensitive files."""
     findings = []
-    name = Path(filepath).name
-
-    for pattern_name, regex in SENSITIVE_FILE_PATTERNS:
-        if regex.match(name):
-            findings.append({
-                "pattern_name": pattern_name,
-                "description": f"Sensitive file type: {name}",
-                "filepath": filepath,
-                "line_number": 0,
-                "line_preview": "(filename match)",
-            })
+    name = os.path.basename(filepath)
+
+    # Dotfiles like .htpasswd count as a suffix too
+    suffix = name[name.rfind("."):].lower() if "." in name else ""
+    matches = []
+    if suffix in SENSITIVE_FILE_SUFFIXES:
+        matches.append(SENSITIVE_FILE_SUFFIXES[suffix])
+
+    # The combined regex only says whether any pattern matches; check each
+    # one individually so a name matching several still reports them all
+    combined, patterns = _sensitive_file_regexes()
+    if combined.match(name):
+        matches.extend(
+            pattern_name for pattern_name, regex in patterns
+            if regex.match(name)
+        )
+
+    for pattern_name in matches:
+        findings.append(Finding(
+            pattern_name=pattern_name,
+            description=f"Sensitive file type: {name}",
+            filepath=filepath,
+            line_number=0,
+            line_preview="(filename match)",
+        ))
 
     return findings
 
 
-def scan_files_for_secrets(files: list[str], root: Path) -> list[dict]:
-    """Scan a list of files for potential secrets (both filename and content)."""
-    all_findings = []
+# Total content size from which secret scanning uses a forked worker pool.
+# Serial scanning runs at roughly 5 MB/s and a forked pool takes ~20 ms to
+# start, so below about 1 MiB the pool can't win back its start-up cost.
+_PARALLEL_SCAN_MIN_BYTES = 1 << 20
+
+
+def _scan_one_file(filepath: str, root: Path) -> list[Finding]:
+    """Scan a single file's name and content for potential secrets."""
+    # Check filename
+    findings = scan_filename_for_secrets(filepath)
+
+    # Check content; missing files are simply skipped
+    try:
+        findings.extend(scan_file_for_secrets(root / filepath, filepath))
+    except (FileNotFoundError, NotADirectoryError, IsADirectoryError):
+        pass  # Missing file, or not a regular file
+    except (UnicodeDecodeError, PermissionError):
+        pass  # Skip binary/unreadable files
+
+    return findings
+
+
+def _use_parallel_scan(files: list[str], root: Path) -> bool:
+    """Return True if `files` are worth scanning across a worker pool.
 
+    Only fork-based pools are used: spawning fresh interpreters (the
+    default on macOS and Windows) costs ~10x more to start.
+    """
+    if len(files) < 2 or (os.cpu_count() or 1) < 2 or sys.platform == "darwin":
+        return False
+    # Imported here so runs that never scan don't pay for multiprocessing
+    import multiprocessing
+    if "fork" not in multiprocessing.get_all_start_methods():
+        return False
+
+    total = 0
     for filepath in files:
-        # Check filename
-        all_findings.extend(scan_filename_for_secrets(filepath))
-
-        # Check content
-        path = root / filepath if not Path(filepath).is_absolute() else Path(filepath)
-        if path.exists():
-            try:
-                content = path.read_text(encoding="utf-8")
-                all_findings.extend(scan_content_for_secrets(content, filepath))
-            except (UnicodeDecodeError, PermissionError):
-                pass  # Skip binary/unreadable files
+        try:
+            total += os.stat(root / filepath).st_size
+        except OSError:
+            continue
+        if total >= _PARALLEL_SCAN_MIN_BYTES:
+            return True
+    return False
 
-    return all_findings
 
+def scan_files_for_secrets(files: list[str], root: Path) -> list[Finding]:
+    """Scan a list of files for potential secrets (both filename and content).
 
-def print_secret_warnings(findings: list[dict]) -> None:
-    """Print formatted secret warnings to stderr."""
-    print("\n" + "!" * 60, file=sys.stderr)
-    print("  POTENTIAL SECRETS DETECTED", file=sys.stderr)
-    print("!" * 60, file=sys.stderr)
+    Large enough file sets are scanned across a process pool, since the
+    regex and entropy work is CPU-bound. Findings keep the order of `files`.
+    """
+    if _use_parallel_scan(files, root):
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        from concurrent.futures.process import BrokenProcessPool
+
+        try:
+            ex = ProcessPoolExecutor(mp_context=multiprocessing.get_context("fork"))
+        except (OSError, NotImplementedError):
+            ex = None  # No usable process pool here; scan serially
+        if ex is not None:
+            with ex:
+                try:
+                    # Submits every task, which is when the workers start
+                    results = ex.map(_scan_one_file, files, [root] * len(files), chunksize=8)
+                except (OSError, BrokenProcessPool):
+                    results = None  # Workers failed to start; scan serially
+                if results is not None:
+                    return [finding for findings in results for finding in findings]
 
-    # Group by file
-    by_file: dict[str, list[dict]] = defaultdict(list)
-    for f in findings:
-        by_file[f["filepath"]].append(f)
+    all_findings = []
+    for filepath in files:
+        all_findings.extend(_scan_one_file(filepath, root))
+    return all_findings
 
-    for filepath, file_findings in sorted(by_file.items()):
-        print(f"\n  {filepath}:", file=sys.stderr)
+
+def print_secret_warnings(findings: list[Finding]) -> None:
+    """Print formatted secret warnings to stderr."""
+    lines = [
+        "\n" + "!" * 60,
+        "  POTENTIAL SECRETS DETECTED",
+        "!" * 60,
+    ]
+    add = lines.append
+
+    # Group by file with one sort; sorting is stable, so each file's
+    # findings stay in scan order (filename match first, then by line)
+    file_count = 0
+    ordered = sorted(findings, key=attrgetter("filepath", "line_number"))
+    for filepath, file_findings in groupby(ordered, key=attrgetter("filepath")):
+        file_count += 1
+        add(f"\n  {filepath}:")
         for finding in file_findings:
-            if finding["line_number"] > 0:
-                print(
-                    f"    Line {finding['line_number']:>4d}: "
-                    f"{finding['pattern_name']} — {finding['description']}",
-                    file=sys.stderr,
+            if finding.line_number > 0:
+                add(
+                    f"    Line {finding.line_number:>4d}: "
+                    f"{finding.pattern_name} — {finding.description}"
                 )
             else:
-                print(
-                    f"    {finding['pattern_name']} — {finding['description']}",
-                    file=sys.stderr,
-                )
+                add(f"    {finding.pattern_name} — {finding.description}")
 
-    print(f"\n  Found {len(findings)} potential secret(s) across "
-          f"{len(by_file)} file(s).", file=sys.stderr)
-    print("  Review the above before sharing this export.", file=sys.stderr)
-    print("!" * 60 + "\n", file=sys.stderr)
+    add(f"\n  Found {len(findings)} potential secret(s) across "
+        f"{file_count} file(s).")
+    add("  Review the above before sharing this export.")
+    add("!" * 60 + "\n")
+    sys.stderr.write("\n".join(lines) + "\n")
 
 
 # ── Main ─────────────────────────────────────────────────────────────
@@ -1387,7 +1817,7 @@ Examples:
     # ── Determine files to export ────────────────────────────────────
     if args.changed:
         files_to_export = []
-        changed = get_git_changed_files(root, set(config["extensions"]))
+        changed = get_git_changed_files(root, _ext_set(config))
         files_to_export.extend(changed)
         if not changed:
             print("No changed files detected.", file=sys.stderr)
@@ -1419,21 +1849,17 @@ Examples:
         
     # --exclude removes specific files from the selection
     if args.exclude:
+        exclude_re = _compile_patterns(args.exclude)
         files_to_export = [
             f for f in files_to_export
-            if not any(
-                fnmatch(f, pattern) or fnmatch(Path(f).name, pattern)
-                for pattern in args.exclude
+            if not (
+                exclude_re.match(norm := os.path.normcase(f))
+                or exclude_re.match(os.path.basename(norm))
             )
         ]
 
     # Deduplicate, preserving order
-    seen = set()
-    unique_files = []
-    for f in files_to_export:
-        if f not in seen:
-            seen.add(f)
-            unique_files.append(f)
+    unique_files = list(dict.fromkeys(files_to_export))
             
     if not unique_files:
         print(
@@ -1448,9 +1874,9 @@ Examples:
         total_size = 0
         print(f"scry would export {len(unique_files)} file(s):\n")
         for f in unique_files:
-            path = root / f
-            if path.exists():
-                size = path.stat().st_size
+            st = _stat_or_none(root / f)
+            if st is not None:
+                size = st.st_size
                 total_size += size
                 print(f"    {f:<55s} {format_file_size(size):>8s}")
             else:
@@ -1476,18 +1902,35 @@ Examples:
                 )
 
     # ── Generate & emit output ───────────────────────────────────────
-    output = format_output(
-        unique_files, root, project_name, config,
-        include_tree=not args.no_tree,
-        output_format=args.format,
-    )
-
     if args.output:
         out_path = Path(args.output)
-        out_path.write_text(output, encoding="utf-8")
+        with open(out_path, "wb") as out:
+            write_output(
+                unique_files, root, project_name, config,
+                include_tree=not args.no_tree,
+                output_format=args.format,
+                out=out,
+            )
         print(f"Exported {len(unique_files)} file(s) to {out_path}")
     else:
-        print(output)
+        out = getattr(sys.stdout, "buffer", None)
+        if out is None:
+            # stdout replaced by a text-only stream (e.g. redirect_stdout)
+            sys.stdout.write(format_output(
+                unique_files, root, project_name, config,
+                include_tree=not args.no_tree,
+                output_format=args.format,
+            ) + "\n")
+        else:
+            sys.stdout.flush()
+            write_output(
+                unique_files, root, project_name, config,
+                include_tree=not args.no_tree,
+                output_format=args.format,
+                out=out,
+            )
+            out.write(b"\n")
+            out.flush()
 
 
 if __name__ == "__main__":